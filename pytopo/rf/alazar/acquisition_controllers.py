@@ -424,7 +424,9 @@ class PostDemodCtl(BaseAcqCtl):
         rng = rng.reshape((len(data.shape)-1)*(1,) + (2,))
 
         if self._nbits == 12:
-            data = np.right_shift(data, 4)        
+            # In-place: self.data is zeroed/overwritten on the next
+            # acquisition anyway, so no need to allocate a shifted copy.
+            data = np.right_shift(data, 4, out=data)
         data = ((data.astype(np.float32) / (2**self._nbits)) - 0.5) * 2 * rng
         if self.average_buffers():
             data /= self.buffers_per_acquisition()
@@ -1,9 +1,63 @@
 import time
 import numpy as np
+import numba as nb
 import qcodes as qc
 
 from qcodes.instrument_drivers.AlazarTech.ATS import AcquisitionController
 
+## UTILITY FUNCTIONS ##
+
+# Explicit signatures: the raw-sample dtypes are known up front, so the
+# kernels are compiled at declaration time (and picked up from the disk
+# cache on later imports) instead of stalling on the first acquisition.
+_rescale_sigs = [
+    nb.void(nb.uint8[::1], nb.float32[::1], nb.float32),
+    nb.void(nb.uint16[::1], nb.float32[::1], nb.float32),
+    nb.void(nb.uint32[::1], nb.float32[::1], nb.float32),
+]
+
+_demod_sigs = [
+    nb.void(src[::1], nb.float32[::1], nb.float32[::1],
+            nb.int64, nb.int64, nb.int64, nb.int64,
+            nb.float32, nb.float32[::1])
+    for src in (nb.uint8, nb.uint16, nb.uint32)
+]
+
+@nb.njit(_rescale_sigs, parallel=True, fastmath=True, cache=True)
+def _to_centered_f32(src, dst, scale):
+    # Fused cast/scale/bias: one pass over the data, no temporaries.
+    # The 12-bit right-shift is folded into the scale factor, since
+    # (x >> 4) / 4096 == x / 65536 for the left-aligned ADC words.
+    for i in nb.prange(src.size):
+        dst[i] = src[i] * scale - np.float32(0.5)
+
+@nb.njit(_demod_sigs, parallel=True, fastmath=True, cache=True)
+def _demod(src, cos_tbl, sin_tbl, period, demod_samples, samples, channels,
+           scale, out):
+    # Stream the raw samples once, rescaling on the fly and accumulating
+    # I/Q per IF period in scalar registers -- no large temporaries.
+    # ``out`` is the complex64 result viewed as float32, so I and Q are
+    # written straight into the interleaved storage.
+    ngroups = src.size // (samples * channels)
+    for o in nb.prange(ngroups * channels):
+        g = o // channels
+        c = o % channels
+        base = g * samples * channels + c
+        for d in range(demod_samples):
+            re = np.float32(0.0)
+            im = np.float32(0.0)
+            s0 = d * period
+            for k in range(period):
+                s = s0 + k
+                x = src[base + s*channels] * scale - np.float32(0.5)
+                re += x * cos_tbl[s]
+                im += x * sin_tbl[s]
+            i = ((g * demod_samples + d) * channels + c) * 2
+            out[i] = re / period * 2
+            out[i+1] = im / period * 2
+
+## CLASSES ##
+
 class BaseAcqCtl(AcquisitionController):
     """
     The baseclass for all the controllers in this file. Implements the basic
@@ -12,6 +66,19 @@ class BaseAcqCtl(AcquisitionController):
     """
     MINSAMPLES = 384
 
+    # Subclasses whose process_buffer just returns its argument set this
+    # so handle_buffer can skip the call and copy/accumulate directly.
+    _process_is_identity = False
+
+    # Subclasses that can reduce a buffer straight into the target slice
+    # of self.data override this with a method taking (buf, out).
+    process_buffer_inplace = None
+
+    # Controllers whose post_acquire goes through the fused demod kernel
+    # never touch the float32 rescale buffer; they switch this off so it
+    # is not pre-sized at the raw data shape.
+    _uses_out_buffer = True
+
     def __init__(self, name, alazar_name, **kwargs):
         self.acquisitionkwargs = {}
         self.number_of_channels = 2
@@ -24,6 +91,8 @@ class BaseAcqCtl(AcquisitionController):
         self.do_allocate_data = True
         self.data = None
         self.tvals = None
+        self._out = None
+        self._zout = None
 
         super().__init__(name, alazar_name, **kwargs)
 
@@ -90,26 +159,51 @@ class BaseAcqCtl(AcquisitionController):
         return max(self.MINSAMPLES, nsamples)
 
     def allocate_data(self):
-        alazar = self._get_alazar()
-        self.tvals = np.arange(self.samples_per_record(), dtype=np.float32) / alazar.sample_rate()
         self.data = np.zeros(self.data_shape(), dtype=self._datadtype)
 
     def pre_start_capture(self):
+        # Snapshot the acquisition geometry into plain ints; each qcodes
+        # parameter call traverses a Python dispatch chain we don't want
+        # in the per-buffer hot path.
+        self._spr = int(self.samples_per_record())
+        self._rpb = int(self.records_per_buffer())
+        self._bpa = int(self.buffers_per_acquisition())
+        self._nch = self.number_of_channels
+
         if self._buffer_order == 'brsc':
-            self.buffer_shape = (self.records_per_buffer(),
-                                 self.samples_per_record(),
-                                 self.number_of_channels)
+            self.buffer_shape = (self._rpb, self._spr, self._nch)
         elif self._buffer_order == 'bcrs':
-            self.buffer_shape = (self.number_of_channels,
-                                 self.records_per_buffer(),
-                                 self.samples_per_record(),)
+            self.buffer_shape = (self._nch, self._rpb, self._spr)
         else:
             raise ValueError('Unknown buffer order {}'.format(self._buffer_order))
 
+        # Precompute the shape and strides that map the flat DMA buffer
+        # onto (records, samples, channels) directly, so handle_buffer
+        # does not need a reshape plus transpose per buffer.
+        itemsize = np.dtype(np.uint8 if self._nbits == 8 else np.uint16).itemsize
+        self._final_shape = (self._rpb, self._spr, self._nch)
+        if self._buffer_order == 'brsc':
+            self._buffer_strides = (self._spr * self._nch * itemsize,
+                                    self._nch * itemsize,
+                                    itemsize)
+        else:
+            self._buffer_strides = (self._spr * itemsize,
+                                    itemsize,
+                                    self._rpb * self._spr * itemsize)
+
+        alazar = self._get_alazar()
+        self.tvals = np.arange(self._spr, dtype=np.float32) / alazar.sample_rate()
+
         if self.do_allocate_data:
             self.allocate_data()
 
-        self.handling_times = np.zeros(self.buffers_per_acquisition(), dtype=np.float64)
+        if self.data is not None and self._uses_out_buffer:
+            self._ensure_out(self.data.shape)
+
+        # Raw perf_counter_ns differences; converted to ms only once in
+        # post_acquire to keep the DMA callback to a single integer store.
+        self._handling_times_ns = np.zeros(self._bpa, dtype=np.int64)
+        self.handling_times = np.zeros(self._bpa, dtype=np.float64)
 
     def pre_acquire(self):
         if self.trigger_func:
@@ -119,20 +213,90 @@ class BaseAcqCtl(AcquisitionController):
         if self.trigger_func:
             self.trigger_func(False)
 
+        self.handling_times = self._handling_times_ns * 1e-6
+
         return self.data
 
+    def _data_scale(self):
+        """
+        Scale factor mapping raw ADC counts onto [0, 1). The 12-bit
+        samples arrive left-aligned in 16-bit words, so their
+        right-shift is folded into the factor.
+        """
+        if self._nbits == 12:
+            return np.float32(1.0 / 2**16)
+        return np.float32(1.0 / 2**8)
+
+    def _ensure_out(self, shape):
+        """
+        Return the reusable float32 output buffer, allocating it only
+        when the requested shape changed. Keeps post_acquire free of
+        per-shot full-size allocations.
+        """
+        if self._out is None or self._out.shape != shape:
+            self._out = np.empty(shape, dtype=np.float32)
+        return self._out
+
+    def _ensure_zout(self, shape):
+        """
+        Same as :meth:`_ensure_out`, for the complex64 demod output.
+        """
+        if self._zout is None or self._zout.shape != shape:
+            self._zout = np.empty(shape, dtype=np.complex64)
+        return self._zout
+
+    def rescale_data(self, data):
+        """
+        Rescale raw ADC counts to the interval [-0.5, 0.5) in a single
+        fused pass, writing into the pre-allocated float32 buffer
+        ``self._out``.
+        """
+        self._ensure_out(data.shape)
+        _to_centered_f32(data.reshape(-1), self._out.reshape(-1),
+                         self._data_scale())
+        return self._out
+
+    def demod_data(self, data):
+        """
+        Demodulate raw ADC data in one fused pass, rescaling on the fly
+        and accumulating I/Q per IF period. ``data`` must have samples
+        and channels as its last two axes. Requires the demodulation
+        attributes (``period``, ``demod_samples``, ``cos_tbl``,
+        ``sin_tbl``) set up by the demodulating controllers' data_shape.
+        """
+        shp = data.shape[:-2] + (self.demod_samples, self._nch)
+        z = self._ensure_zout(shp)
+        _demod(data.reshape(-1), self.cos_tbl, self.sin_tbl,
+               self.period, self.demod_samples, self._spr, self._nch,
+               self._data_scale(), z.reshape(-1).view(np.float32))
+        return z
+
     def handle_buffer(self, data, buffer_number=None):
-        t0 = time.perf_counter()
-        data.shape = self.buffer_shape
-        if self._buffer_order == 'bcrs':
-            data = data.transpose((1,2,0))
+        t0 = time.perf_counter_ns()
+        data = np.ndarray(self._final_shape, dtype=data.dtype,
+                          buffer=data.data, strides=self._buffer_strides)
+
+        # The bcrs view is non-contiguous; reductions in process_buffer
+        # want unit stride on the innermost axis, so make one explicit
+        # copy there. The identity paths copy/accumulate in one pass
+        # anyway and handle the strided view directly.
+        if self._buffer_order == 'bcrs' and not self._process_is_identity:
+            data = np.ascontiguousarray(data)
 
         if buffer_number is None or self._average_buffers:
-            self.data += self.process_buffer(data)
-            self.handling_times[0] = (time.perf_counter() - t0) * 1e3
+            if self._process_is_identity:
+                self.data += data
+            else:
+                self.data += self.process_buffer(data)
+            self._handling_times_ns[0] = time.perf_counter_ns() - t0
         else:
-            self.data[buffer_number] = self.process_buffer(data)
-            self.handling_times[buffer_number] = (time.perf_counter() - t0) * 1e3
+            if self._process_is_identity:
+                np.copyto(self.data[buffer_number], data)
+            elif self.process_buffer_inplace is not None:
+                self.process_buffer_inplace(data, self.data[buffer_number])
+            else:
+                self.data[buffer_number] = self.process_buffer(data)
+            self._handling_times_ns[buffer_number] = time.perf_counter_ns() - t0
 
 
     def update_acquisitionkwargs(self, **kwargs):
@@ -155,6 +319,8 @@ class RawAcqCtl(BaseAcqCtl):
     a 4 dimensional array. Buffers x Records x Samples X Channels. No postprocessing
     is performed.
     """
+    _process_is_identity = True
+
     def data_shape(self):
         """
         Shape of the data that this controller will produce
@@ -194,10 +360,7 @@ class RawAcqCtl(BaseAcqCtl):
 
     def post_acquire(self):
         data = super().post_acquire()
-        if self._nbits == 12:
-            data = np.right_shift(self.data, 4)
-
-        return (data.astype(np.float32) / (2**self._nbits)) - 0.5
+        return self.rescale_data(data)
 
 
 class DemodCtl(BaseAcqCtl):
@@ -205,11 +368,21 @@ class DemodCtl(BaseAcqCtl):
     A controller that demodulates the data from the Alazar.
     Returns buffers x records x demod_samples x channels.
     """
+    _process_is_identity = True
+    _uses_out_buffer = False
 
     def __init__(self, *arg, **kw):
         super().__init__(*arg, **kw)
         self.add_parameter('demod_frq', set_cmd=None, unit='Hz')
 
+    def allocate_data(self):
+        # self.data holds the raw samples, not the demodulated output;
+        # data_shape() is still called for its side effect of setting
+        # up the demodulation tables.
+        self.data_shape()
+        self.data = np.zeros((self._bpa, self._rpb, self._spr, self._nch),
+                             dtype=self._datadtype)
+
     def data_shape(self):
         """
         Shape of the data that this controller will produce
@@ -220,8 +393,8 @@ class DemodCtl(BaseAcqCtl):
         self.period = int(self.sample_rate() / self.demod_frq() + 0.5)
         self.demod_samples = self.samples_per_record() // self.period
         self.demod_tvals = self.tvals[::self.period][:self.demod_samples]
-        self.cosarr = (np.cos(2*np.pi*self.demod_frq()*self.tvals).reshape(1,1,-1,1))
-        self.sinarr = (np.sin(2*np.pi*self.demod_frq()*self.tvals).reshape(1,1,-1,1))
+        self.cos_tbl = np.cos(2*np.pi*self.demod_frq()*self.tvals).astype(np.float32)
+        self.sin_tbl = np.sin(2*np.pi*self.demod_frq()*self.tvals).astype(np.float32)
 
         shp = (
             self.buffers_per_acquisition(), 
@@ -232,17 +405,6 @@ class DemodCtl(BaseAcqCtl):
 
         return shp
 
-    def pre_start_capture(self):
-        super().pre_start_capture()
-        shp = (
-            self.buffers_per_acquisition(), 
-            self.records_per_buffer(), 
-            self.samples_per_record(),
-            self.number_of_channels
-        )
-        self.data = np.zeros(shp, dtype=self._datadtype)
-
-    
     def data_dims(self):
         """
         Dimensions of the data produced
@@ -262,18 +424,7 @@ class DemodCtl(BaseAcqCtl):
 
     def post_acquire(self):
         data = super().post_acquire()
-        if self._nbits == 12:
-            data = np.right_shift(data, 4)
-        data = (data.astype(np.float32) / (2**self._nbits)) - 0.5
-
-        real = (data * 2 * self.cosarr)[:,:,:self.demod_samples*self.period,:].reshape(
-            self.buffers_per_acquisition(), -1, 
-            self.demod_samples, self.period, self.number_of_channels).mean(axis=-2)
-        imag = (data * 2 * self.sinarr)[:,:,:self.demod_samples*self.period,:].reshape(
-            self.buffers_per_acquisition(), -1, 
-            self.demod_samples, self.period, self.number_of_channels).mean(axis=-2)
-        
-        return real + 1j * imag
+        return self.demod_data(data)
 
 
 
@@ -282,6 +433,8 @@ class AvgBufCtl(BaseAcqCtl):
     A controller that averages over buffers. The data returned has the shape
     of Records x Samples x Channels
     """
+    _process_is_identity = True
+
     def __init__(self, *arg, **kw):
         super().__init__(*arg, **kw)
         self._average_buffers = True
@@ -320,10 +473,7 @@ class AvgBufCtl(BaseAcqCtl):
 
     def post_acquire(self):
         data = super().post_acquire()
-        if self._nbits == 12:
-            data = np.right_shift(self.data, 4)
-
-        return (data.astype(np.float32) / (2**self._nbits)) - 0.5
+        return self.rescale_data(data)
 
 
 class AvgRecCtl(BaseAcqCtl):
@@ -368,12 +518,16 @@ class AvgRecCtl(BaseAcqCtl):
         the first dimension"""
         return np.mean(buf, axis=0)
 
+    def process_buffer_inplace(self, buf, out):
+        """Average over records directly into the target slice of
+        ``self.data``, skipping the intermediate return-value array.
+        The sum is accumulated in int64; summing in the narrow output
+        dtype would wrap once enough records are averaged."""
+        out[:] = buf.sum(axis=0, dtype=np.int64) // buf.shape[0]
+
     def post_acquire(self):
         data = super().post_acquire()
-        if self._nbits == 12:
-            data = np.right_shift(self.data, 4)
-
-        return (data.astype(np.float32) / (2**self._nbits)) - 0.5
+        return self.rescale_data(data)
 
 
 class AvgDemodCtl(AvgBufCtl):
@@ -386,10 +540,18 @@ class AvgDemodCtl(AvgBufCtl):
     sample_rate//demod_frq rounded up to nearest integer compared to
     the samples in the time series.
     """
+    _uses_out_buffer = False
+
     def __init__(self, *arg, **kw):
         super().__init__(*arg, **kw)
         self.add_parameter('demod_frq', set_cmd=None, unit='Hz')
 
+    def allocate_data(self):
+        # Raw-shape accumulator; data_shape() sets up the demod tables.
+        self.data_shape()
+        self.data = np.zeros((self._rpb, self._spr, self._nch),
+                             dtype=self._datadtype)
+
     def data_shape(self):
         """
         Shape of the data that this controller will produce
@@ -400,8 +562,8 @@ class AvgDemodCtl(AvgBufCtl):
         self.period = int(self.sample_rate() / self.demod_frq() + 0.5)
         self.demod_samples = self.samples_per_record() // self.period
         self.demod_tvals = self.tvals[::self.period][:self.demod_samples]
-        self.cosarr = (np.cos(2*np.pi*self.demod_frq()*self.tvals).reshape(1,-1,1))
-        self.sinarr = (np.sin(2*np.pi*self.demod_frq()*self.tvals).reshape(1,-1,1))
+        self.cos_tbl = np.cos(2*np.pi*self.demod_frq()*self.tvals).astype(np.float32)
+        self.sin_tbl = np.sin(2*np.pi*self.demod_frq()*self.tvals).astype(np.float32)
 
         return (self.records_per_buffer(),
                 self.demod_samples,
@@ -416,23 +578,13 @@ class AvgDemodCtl(AvgBufCtl):
         """
         return ('records', 'IF_periods', 'channels')
 
-    def pre_start_capture(self):
-        super().pre_start_capture()
-        self.data = np.zeros((
-            self.records_per_buffer(),
-            self.samples_per_record(),
-            self.number_of_channels,
-        )).astype(self._datadtype)
-
     def post_acquire(self):
         """Demodulate the data and average over period of
         sample_rate//demod_frq rounded up to nearest integer"""
-        data = super().post_acquire()
-        real = (data * 2 * self.cosarr)[:,:self.demod_samples*self.period,:].reshape(
-            -1, self.demod_samples, self.period, self.number_of_channels).mean(axis=-2)
-        imag = (data * 2 * self.sinarr)[:,:self.demod_samples*self.period,:].reshape(
-            -1, self.demod_samples, self.period, self.number_of_channels).mean(axis=-2)
-        return real + 1j * imag
+        # Demodulate straight from the raw buffer average; the fused
+        # kernel rescales inline, so skip AvgBufCtl's rescale pass.
+        data = BaseAcqCtl.post_acquire(self)
+        return self.demod_data(data)
 
 
 class AvgRecDemodCtl(AvgRecCtl):
@@ -449,6 +601,12 @@ class AvgRecDemodCtl(AvgRecCtl):
         super().__init__(*arg, **kw)
         self.add_parameter('demod_frq', set_cmd=None, unit='Hz')
 
+    def allocate_data(self):
+        # Raw-shape accumulator; data_shape() sets up the demod tables.
+        self.data_shape()
+        self.data = np.zeros((self._bpa, self._spr, self._nch),
+                             dtype=self._datadtype)
+
     def data_shape(self):
         """
         Shape of the data that this controller will produce
@@ -459,8 +617,16 @@ class AvgRecDemodCtl(AvgRecCtl):
         self.period = int(self.sample_rate() / self.demod_frq() + 0.5)
         self.demod_samples = self.samples_per_record() // self.period
         self.demod_tvals = self.tvals[::self.period][:self.demod_samples]
-        self.cosarr = (np.cos(2*np.pi*self.demod_frq()*self.tvals).reshape(1,-1,1))
-        self.sinarr = (np.sin(2*np.pi*self.demod_frq()*self.tvals).reshape(1,-1,1))
+        # Per-demod-sample (2, period) cos/sin matrices, with the factor
+        # of 2 from the demodulation and the 1/period of the period
+        # average baked in. The period reduction in post_acquire is then
+        # a single batched GEMM against this kernel.
+        n = self.demod_samples * self.period
+        phase = 2*np.pi*self.demod_frq()*self.tvals[:n]
+        tbl = np.stack([np.cos(phase), np.sin(phase)]) * (2 / self.period)
+        self._demod_kernel = np.ascontiguousarray(
+            tbl.astype(np.float32).reshape(
+                2, self.demod_samples, self.period).transpose(1, 0, 2))
 
         return (self.records_per_buffer(),
                 self.demod_samples,
@@ -475,23 +641,25 @@ class AvgRecDemodCtl(AvgRecCtl):
         """
         return ('buffers', 'IF_periods', 'channels')
 
-    def pre_start_capture(self):
-        super().pre_start_capture()
-        self.data = np.zeros((
-            self.buffers_per_acquisition(),
-            self.samples_per_record(),
-            self.number_of_channels,
-        )).astype(self._datadtype)
-
     def post_acquire(self):
         """Demodulate the data and average over period of
         sample_rate//demod_frq rounded up to nearest integer"""
         data = super().post_acquire()
-        real = (data * 2 * self.cosarr)[:,:self.demod_samples*self.period,:].reshape(
-            -1, self.demod_samples, self.period, self.number_of_channels).mean(axis=-2)
-        imag = (data * 2 * self.sinarr)[:,:self.demod_samples*self.period,:].reshape(
-            -1, self.demod_samples, self.period, self.number_of_channels).mean(axis=-2)
-        return real + 1j * imag
+
+        # Batched GEMM over the period axis: for every demod sample d,
+        # (2, period) @ (period, buffers*channels) in one BLAS call.
+        n = self.demod_samples * self.period
+        x = data[:, :n, :].reshape(-1, self.demod_samples,
+                                   self.period, self._nch)
+        x = np.ascontiguousarray(x.transpose(1, 2, 0, 3)).reshape(
+            self.demod_samples, self.period, -1)
+        iq = np.matmul(self._demod_kernel, x)
+
+        iq = iq.reshape(self.demod_samples, 2, -1, self._nch)
+        z = self._ensure_zout((data.shape[0], self.demod_samples, self._nch))
+        z.real[...] = iq[:, 0].transpose(1, 0, 2)
+        z.imag[...] = iq[:, 1].transpose(1, 0, 2)
+        return z
 
 
 class AvgIQCtl(AvgDemodCtl):
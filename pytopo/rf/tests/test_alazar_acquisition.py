@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from pytopo.rf.alazar_acquisition import AvgRecCtl
+
+
+@pytest.mark.parametrize("dtype", [np.uint16, np.uint32])
+def test_record_average_does_not_wrap(dtype):
+    # 300 records of full-scale 8-bit samples: summing in the output
+    # dtype would wrap for uint16 (300 * 255 > 2**16).
+    ctl = object.__new__(AvgRecCtl)
+    buf = np.full((300, 128, 2), 255, dtype=dtype)
+    out = np.empty((128, 2), dtype=dtype)
+
+    ctl.process_buffer_inplace(buf, out)
+
+    assert np.array_equal(out, np.full((128, 2), 255, dtype=dtype))
+
+
+@pytest.mark.parametrize("dtype", [np.uint16, np.uint32])
+def test_record_average_matches_process_buffer(dtype):
+    ctl = object.__new__(AvgRecCtl)
+    rng = np.random.RandomState(0)
+    buf = rng.randint(0, 2**12, size=(300, 64, 2)).astype(dtype) << 4
+    out = np.empty((64, 2), dtype=dtype)
+
+    ctl.process_buffer_inplace(buf, out)
+
+    expected = ctl.process_buffer(buf).astype(dtype)
+    assert np.array_equal(out, expected)
@@ -223,9 +223,15 @@ class _CallSweepObject(BaseSweepObject):
     """
     def __init__(self, call_function, *args, **kwargs):
         super().__init__()
-        self._caller = lambda: call_function(*args, **kwargs)
+        self._fn = call_function
+        self._args = args
+        self._kwargs = kwargs
         self._parameter_table = ParamTable([], nests=[[]])
 
+    def _caller(self):
+        # Bound method instead of a closure: no cell dereferences per call.
+        return self._fn(*self._args, **self._kwargs)
+
     def _generator_factory(self):
         self._caller()
         yield {}
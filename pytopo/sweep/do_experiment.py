@@ -1,6 +1,8 @@
-import numpy as np
+import time
 from warnings import warn
 
+import numpy as np
+
 import qcodes
 from qcodes.dataset.data_export import get_data_by_id
 from qcodes.dataset.plotting import plot_by_id
@@ -10,6 +12,55 @@ from qcodes.dataset.data_set import DataSet
 from pytopo.sweep.measurement import SweepMeasurement
 
 
+def _save_output(datasaver, sweep_object, chunk_size=1024):
+    """
+    Unroll a sweep object into a data saver. Consecutive scalar-valued
+    points that share the same set of parameters are stacked into one
+    array per parameter and written with a single ``add_result`` call,
+    so the per-point qcodes dispatch overhead is paid once per chunk
+    rather than once per point.
+
+    Besides filling up or a change of parameter set, a chunk is also
+    flushed once ``datasaver.write_period`` has elapsed, so that slow
+    sweeps reach the database (and any live-plot subscribers) as often
+    as a per-point loop would.
+    """
+    keys = None
+    rows = []
+    deadline = time.perf_counter() + datasaver.write_period
+
+    def flush():
+        nonlocal deadline
+        deadline = time.perf_counter() + datasaver.write_period
+        if not rows:
+            return
+        if len(rows) == 1:
+            datasaver.add_result(*rows[0].items())
+        else:
+            datasaver.add_result(
+                *((key, np.array([row[key] for row in rows]))
+                  for key in keys))
+        rows.clear()
+
+    for data in sweep_object:
+        if any(np.ndim(value) != 0 for value in data.values()):
+            # Array-valued results already amortize the call overhead;
+            # write them through directly.
+            flush()
+            datasaver.add_result(*data.items())
+            continue
+
+        if tuple(data) != keys:
+            flush()
+            keys = tuple(data)
+
+        rows.append(data)
+        if len(rows) >= chunk_size or time.perf_counter() >= deadline:
+            flush()
+
+    flush()
+
+
 class _DataExtractor:
     """
     A convenience class to quickly extract data from a data saver instance
@@ -20,22 +71,18 @@ class _DataExtractor:
 
     def __getitem__(self, layout):
 
-        layout = sorted(layout.split(","))
+        layout = set(layout.split(","))
         all_data = get_data_by_id(self._run_id)
-        data_layouts = [sorted([d["name"] for d in ad]) for ad in all_data]
 
-        i = np.array([
-            set(layout).issubset(set(data_layout))
-            for data_layout in data_layouts
-        ])
+        # This is a find-first operation: scan once and return on the
+        # first matching layout instead of testing them all.
+        for data in all_data:
+            if layout.issubset({d["name"] for d in data}):
+                return {d["name"]: d["data"] for d in data}
 
-        ind = np.flatnonzero(i)
-        if len(ind) == 0:
-            raise ValueError(f"No such layout {layout}. "
-                             f"Available layouts: {data_layouts}")
-
-        data = all_data[ind[0]]
-        return {d["name"]: d["data"] for d in data}
+        data_layouts = [sorted([d["name"] for d in ad]) for ad in all_data]
+        raise ValueError(f"No such layout {sorted(layout)}. "
+                         f"Available layouts: {data_layouts}")
 
     def plot(self):
         plot_by_id(self._run_id)
@@ -47,7 +94,7 @@ class _DataExtractor:
 
 def do_experiment(
         experiment_name, sweep_object, setup=None, cleanup=None,
-        station=None, live_plot=False):
+        station=None, live_plot=False, chunk_size=1024):
 
     if "/" in experiment_name:
         experiment_name, sample_name = experiment_name.split("/")
@@ -60,7 +107,12 @@ def do_experiment(
         if callables is None:
             return
 
-        for cabble in np.atleast_1d(callables):
+        # np.atleast_1d would box the callables in an object-dtype
+        # array; a plain sequence check is all that is needed here.
+        if not isinstance(callables, (list, tuple)):
+            callables = (callables,)
+
+        for cabble in callables:
             if not isinstance(cabble, tuple):
                 cabble = (cabble, ())
 
@@ -91,7 +143,6 @@ def do_experiment(
                 state=[], min_wait=0, min_count=1
             )
 
-        for data in sweep_object:
-            datasaver.add_result(*data.items())
+        _save_output(datasaver, sweep_object, chunk_size=chunk_size)
 
     return _DataExtractor(datasaver)
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+import qcodes
+from qcodes import Parameter
+from qcodes.dataset.database import initialise_database
+
+from pytopo.sweep import sweep, measure, chain, do_experiment
+from pytopo.sweep.do_experiment import _save_output
+
+
+@pytest.fixture
+def temporary_db(tmp_path):
+    original_location = qcodes.config["core"]["db_location"]
+    qcodes.config["core"]["db_location"] = str(tmp_path / "test.db")
+    initialise_database()
+    yield
+    qcodes.config["core"]["db_location"] = original_location
+
+
+class _RecordingSaver:
+    """
+    Stand-in for a qcodes DataSaver which records add_result calls.
+    """
+    def __init__(self, write_period=5.0):
+        self.write_period = write_period
+        self.calls = []
+
+    def add_result(self, *args):
+        self.calls.append(args)
+
+
+def _unroll(calls):
+    """
+    Expand recorded add_result calls back into one dictionary per point.
+    """
+    rows = []
+    for call in calls:
+        names = [name for name, _ in call]
+        values = [np.atleast_1d(value) for _, value in call]
+        for point in zip(*values):
+            rows.append(dict(zip(names, point)))
+    return rows
+
+
+def test_do_experiment_saves_all_points(temporary_db):
+    px = Parameter("x", set_cmd=None, get_cmd=None)
+    pm = Parameter("m", set_cmd=None, get_cmd=lambda: px.get() ** 2)
+
+    sweep_values = list(range(50))
+    result = do_experiment(
+        "test_experiment/test_sample",
+        sweep(px, sweep_values)(measure(pm))
+    )
+
+    data = result["x,m"]
+    assert np.array_equal(data["x"], sweep_values)
+    assert np.array_equal(data["m"], np.array(sweep_values) ** 2)
+
+
+def test_do_experiment_saves_chained_measures(temporary_db):
+    px = Parameter("x", set_cmd=None, get_cmd=None)
+    pi = Parameter("i", set_cmd=None, get_cmd=lambda: px.get() ** 2)
+    pj = Parameter("j", set_cmd=None, get_cmd=lambda: px.get() + 1)
+
+    sweep_values = list(range(20))
+    result = do_experiment(
+        "test_experiment/test_sample",
+        sweep(px, sweep_values)(chain(measure(pi), measure(pj)))
+    )
+
+    data_i = result["x,i"]
+    data_j = result["x,j"]
+    assert np.array_equal(data_i["i"], np.array(sweep_values) ** 2)
+    assert np.array_equal(data_j["j"], np.array(sweep_values) + 1)
+
+
+def test_save_output_chunks_points():
+    points = [{"x": i, "m": i ** 2} for i in range(10)]
+    saver = _RecordingSaver()
+
+    _save_output(saver, points, chunk_size=4)
+
+    assert len(saver.calls) == 3  # 4 + 4 + 2 points
+    assert _unroll(saver.calls) == points
+
+
+def test_save_output_flushes_on_parameter_change():
+    points = [{"x": 0, "i": 1}, {"x": 1, "j": 2}, {"x": 2, "i": 3}]
+    saver = _RecordingSaver()
+
+    _save_output(saver, points, chunk_size=100)
+
+    assert len(saver.calls) == 3
+    assert _unroll(saver.calls) == points
+
+
+def test_save_output_flushes_on_write_period():
+    points = [{"x": i} for i in range(10)]
+    saver = _RecordingSaver(write_period=0.0)
+
+    _save_output(saver, points, chunk_size=100)
+
+    # With an expired write period every point is written immediately.
+    assert len(saver.calls) == len(points)
+    assert _unroll(saver.calls) == points